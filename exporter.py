@@ -0,0 +1,38 @@
+import tensorflow as tf
+from utils import data_utils, io_utils, train_utils
+
+args = io_utils.handle_args()
+if args.handle_gpu:
+    io_utils.handle_gpu_compatibility()
+
+export_batch_size = 1
+backbone = args.backbone
+io_utils.is_valid_backbone(backbone)
+#
+if backbone == "mobilenet_v2":
+    from models.ssd_mobilenet_v2 import get_model
+else:
+    from models.ssd_vgg16 import get_model, fuse_l2_normalization
+#
+hyper_params = train_utils.get_hyper_params(backbone)
+#
+info = data_utils.get_dataset_info("voc/2007")
+labels = data_utils.get_labels(info)
+labels = ["bg"] + labels
+hyper_params["total_labels"] = len(labels)
+img_size = hyper_params["img_size"]
+
+ssd_model = get_model(hyper_params)
+ssd_model_path = io_utils.get_model_path(backbone)
+ssd_model.load_weights(ssd_model_path)
+if backbone == "vgg16":
+    ssd_model = fuse_l2_normalization(ssd_model)
+
+# Fully static input shape, so the serving signature could be compiled ahead of time with saved_model_cli aot_compile_cpu
+@tf.function(input_signature=[tf.TensorSpec((export_batch_size, img_size, img_size, 3), dtype=tf.float32, name="input")])
+def serving_fn(img):
+    pred_deltas, pred_labels = ssd_model(img, training=False)
+    return {"loc": pred_deltas, "conf": pred_labels}
+
+ssd_export_path = io_utils.get_export_path(backbone)
+tf.saved_model.save(ssd_model, ssd_export_path, signatures=serving_fn)
@@ -5,11 +5,11 @@ from utils import bbox_utils
 
 class SSDDecoder(Layer):
     """Generating bounding boxes and labels from ssd predictions.
-    First calculating the boxes from predicted deltas and label probs.
+    First calculating the boxes from predicted deltas and label logits.
     Then applied non max suppression and selecting top_n boxes by scores.
     inputs:
         pred_deltas = (batch_size, total_prior_boxes, [delta_y, delta_x, delta_h, delta_w])
-        pred_label_probs = (batch_size, total_prior_boxes, [0,0,...,0])
+        pred_label_logits = (batch_size, total_prior_boxes, [0,0,...,0])
     outputs:
         pred_bboxes = (batch_size, top_n, [y1, x1, y2, x2])
         pred_labels = (batch_size, top_n)
@@ -26,7 +26,7 @@ class SSDDecoder(Layer):
     def get_config(self):
         config = super(SSDDecoder, self).get_config()
         config.update({
-            "prior_boxes": self.prior_boxes.numpy(),
+            "prior_boxes": self.prior_boxes,
             "variances": self.variances,
             "max_total_size": self.max_total_size,
             "score_threshold": self.score_threshold
@@ -35,14 +35,17 @@ class SSDDecoder(Layer):
 
     def call(self, inputs):
         pred_deltas = inputs[0]
-        pred_label_probs = inputs[1]
+        pred_label_logits = inputs[1]
         batch_size = tf.shape(pred_deltas)[0]
         #
         pred_deltas *= self.variances
         pred_bboxes = bbox_utils.get_bboxes_from_deltas(self.prior_boxes, pred_deltas)
-        #
-        pred_labels_map = tf.expand_dims(tf.argmax(pred_label_probs, -1), -1)
-        pred_labels = tf.where(tf.not_equal(pred_labels_map, 0), pred_label_probs, tf.zeros_like(pred_label_probs))
+        # Argmax of the logits same with the argmax of the probs,
+        # so softmax calculated only for the prior boxes which are not background
+        pred_labels_map = tf.argmax(pred_label_logits, -1)
+        non_bg_indices = tf.where(tf.not_equal(pred_labels_map, 0))
+        non_bg_label_probs = tf.nn.softmax(tf.gather_nd(pred_label_logits, non_bg_indices), axis=-1)
+        pred_labels = tf.scatter_nd(non_bg_indices, non_bg_label_probs, tf.shape(pred_label_logits, out_type=tf.int64))
         # Reshape bboxes for non max suppression
         pred_bboxes = tf.reshape(pred_bboxes, (batch_size, -1, 1, 4))
         #
@@ -65,5 +68,6 @@ def get_decoder_model(base_model, prior_boxes, hyper_params):
     outputs:
         ssd_decoder_model = tf.keras.model
     """
-    bboxes, classes, scores = SSDDecoder(prior_boxes, hyper_params["variances"])(base_model.output)
+    # Decoding and non max suppression always in float32 like the prior boxes
+    bboxes, classes, scores = SSDDecoder(prior_boxes, hyper_params["variances"], dtype="float32")(base_model.output)
     return Model(inputs=base_model.input, outputs=[bboxes, classes, scores])
@@ -1,5 +1,6 @@
 import tensorflow as tf
-from tensorflow.keras.layers import Layer, Input, Conv2D, MaxPool2D, Activation
+import math
+from tensorflow.keras.layers import Layer, Input, Conv2D, MaxPool2D
 
 class HeadWrapper(Layer):
     """Merging all feature maps for detections.
@@ -18,28 +19,59 @@ class HeadWrapper(Layer):
             ssd300 conv11_2 shape => (1 x 1 x 4) = 4
                                            Total = 8732 default box
 
+    Head convolutions could have padded output channels,
+    only first (aspect_ratios x last_dimension) channels used for each feature map.
+
     outputs:
         merged_head = (batch_size, total_prior_boxes, last_dimension)
     """
 
-    def __init__(self, last_dimension, **kwargs):
+    def __init__(self, last_dimension, len_aspect_ratios, **kwargs):
         super(HeadWrapper, self).__init__(**kwargs)
         self.last_dimension = last_dimension
+        self.len_aspect_ratios = len_aspect_ratios
 
     def get_config(self):
         config = super(HeadWrapper, self).get_config()
-        config.update({"last_dimension": self.last_dimension})
+        config.update({"last_dimension": self.last_dimension, "len_aspect_ratios": self.len_aspect_ratios})
         return config
 
     def call(self, inputs):
         last_dimension = self.last_dimension
         batch_size = tf.shape(inputs[0])[0]
-        outputs = []
-        for conv_layer in inputs:
-            outputs.append(tf.reshape(conv_layer, (batch_size, -1, last_dimension)))
+        outputs = [tf.reshape(conv_layer[..., :len_aspect_ratio * last_dimension],
+                              (batch_size, self.get_total_prior_boxes(conv_layer, len_aspect_ratio), last_dimension))
+                   for conv_layer, len_aspect_ratio in zip(inputs, self.len_aspect_ratios)]
         #
         return tf.concat(outputs, axis=1)
 
+    @staticmethod
+    def get_total_prior_boxes(conv_layer, len_aspect_ratio):
+        """Calculating prior box count of the feature map statically when the feature map size is known.
+        With static counts the merged head has a fully defined shape for graph optimizations.
+        inputs:
+            conv_layer = (batch_size, feature_map_height, feature_map_width, channels)
+            len_aspect_ratio = number of prior boxes for each location
+
+        outputs:
+            total_prior_boxes = (feature_map_height x feature_map_width x len_aspect_ratio) or -1 for dynamic sizes
+        """
+        height, width = conv_layer.shape[1], conv_layer.shape[2]
+        if height is None or width is None:
+            return -1
+        return height * width * len_aspect_ratio
+
+def get_padded_channels(channels, multiple=8):
+    """Rounding up channel size to the nearest multiple for tensor core friendly convolution shapes.
+    inputs:
+        channels = required output channel size
+        multiple = channel size should be divisible by this value
+
+    outputs:
+        padded_channels = smallest multiple of the given value which is greater than or equal to channels
+    """
+    return int(math.ceil(channels / multiple) * multiple)
+
 def get_head_from_outputs(hyper_params, outputs):
     """Generating ssd bbox delta and label heads.
     inputs:
@@ -49,6 +81,7 @@ def get_head_from_outputs(hyper_params, outputs):
     outputs:
         pred_deltas = merged outputs for bbox delta head
         pred_labels = merged outputs for bbox label head
+            raw logits, softmax applied by the loss function and the decoder
     """
     total_labels = hyper_params["total_labels"]
     # +1 for ratio 1
@@ -57,11 +90,12 @@ def get_head_from_outputs(hyper_params, outputs):
     boxes_head = []
     for i, output in enumerate(outputs):
         aspect_ratio = len_aspect_ratios[i]
-        labels_head.append(Conv2D(aspect_ratio * total_labels, (3, 3), padding="same", name="{}_conv_label_output".format(i+1))(output))
-        boxes_head.append(Conv2D(aspect_ratio * 4, (3, 3), padding="same", name="{}_conv_boxes_output".format(i+1))(output))
+        # Output channels padded to multiple of 8 for tensor cores, extra channels sliced in the HeadWrapper
+        labels_head.append(Conv2D(get_padded_channels(aspect_ratio * total_labels), (3, 3), padding="same", name="{}_conv_label_output".format(i+1))(output))
+        boxes_head.append(Conv2D(get_padded_channels(aspect_ratio * 4), (3, 3), padding="same", name="{}_conv_boxes_output".format(i+1))(output))
     #
-    pred_labels = HeadWrapper(total_labels, name="labels_head")(labels_head)
-    pred_labels = Activation("softmax", name="conf")(pred_labels)
+    # Final outputs always in float32 for numerically stable softmax and loss calculations under mixed precision
+    pred_labels = HeadWrapper(total_labels, len_aspect_ratios, dtype="float32", name="conf")(labels_head)
     #
-    pred_deltas = HeadWrapper(4, name="loc")(boxes_head)
+    pred_deltas = HeadWrapper(4, len_aspect_ratios, dtype="float32", name="loc")(boxes_head)
     return pred_deltas, pred_labels
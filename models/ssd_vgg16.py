@@ -1,5 +1,6 @@
 import tensorflow as tf
-from tensorflow.keras.layers import Layer, Input, Conv2D, MaxPool2D
+from tensorflow.keras.applications.vgg16 import VGG16
+from tensorflow.keras.layers import Layer, Input, Conv2D, DepthwiseConv2D, MaxPool2D
 from tensorflow.keras.models import Model
 from tensorflow.keras.regularizers import l2
 from .header import get_head_from_outputs
@@ -13,13 +14,14 @@ class L2Normalization(Layer):
     outputs:
         normalized_feature_map = (batch_size, feature_map_height, feature_map_width, depth)
     """
-    def __init__(self, scale_factor, **kwargs):
+    def __init__(self, scale_factor, fused=False, **kwargs):
         super(L2Normalization, self).__init__(**kwargs)
         self.scale_factor = scale_factor
+        self.fused = fused
 
     def get_config(self):
         config = super(L2Normalization, self).get_config()
-        config.update({"scale_factor": self.scale_factor})
+        config.update({"scale_factor": self.scale_factor, "fused": self.fused})
         return config
 
     def build(self, input_shape):
@@ -28,7 +30,25 @@ class L2Normalization(Layer):
         self.scale = tf.Variable(init_scale_factor, trainable=True)
 
     def call(self, inputs):
-        return tf.nn.l2_normalize(inputs, axis=-1) * self.scale
+        normalized_inputs = tf.nn.l2_normalize(inputs, axis=-1)
+        # Scale factor already folded into the following convolutions, see fuse_l2_normalization
+        if self.fused:
+            return normalized_inputs
+        return normalized_inputs * self.scale
+
+class CaffePreprocessing(Layer):
+    """Converting images to the caffe style inputs of the imagenet pretrained vgg16 weights.
+    inputs:
+        images = (batch_size, height, width, [r, g, b])
+            in normalized form [0, 1]
+
+    outputs:
+        preprocessed_images = (batch_size, height, width, [b, g, r])
+            in [0, 255] range with imagenet mean subtracted
+    """
+    def call(self, inputs):
+        bgr_mean = tf.cast([103.939, 116.779, 123.68], dtype=inputs.dtype)
+        return inputs[..., ::-1] * tf.cast(255.0, dtype=inputs.dtype) - bgr_mean
 
 def get_model(hyper_params):
     """Generating ssd model for hyper params.
@@ -48,8 +68,9 @@ def get_model(hyper_params):
     len_aspect_ratios = [len(x) + 1 for x in hyper_params["aspect_ratios"]]
     #
     input = Input(shape=(None, None, 3), name="input")
+    preprocessed_input = CaffePreprocessing(name="preprocessing")(input)
     # conv1 block
-    conv1_1 = Conv2D(64, (3, 3), padding="same", activation="relu", kernel_initializer="glorot_normal", kernel_regularizer=l2(reg_factor), name="conv1_1")(input)
+    conv1_1 = Conv2D(64, (3, 3), padding="same", activation="relu", kernel_initializer="glorot_normal", kernel_regularizer=l2(reg_factor), name="conv1_1")(preprocessed_input)
     conv1_2 = Conv2D(64, (3, 3), padding="same", activation="relu", kernel_initializer="glorot_normal", kernel_regularizer=l2(reg_factor), name="conv1_2")(conv1_1)
     pool1 = MaxPool2D((2, 2), strides=(2, 2), padding="same", name="pool1")(conv1_2)
     # conv2 block
@@ -77,25 +98,52 @@ def get_model(hyper_params):
     conv6 = Conv2D(1024, (3, 3), dilation_rate=6, padding="same", activation="relu", kernel_initializer="glorot_normal", kernel_regularizer=l2(reg_factor), name="conv6")(pool5)
     conv7 = Conv2D(1024, (1, 1), strides=(1, 1), padding="same", activation="relu", kernel_initializer="glorot_normal", kernel_regularizer=l2(reg_factor), name="conv7")(conv6)
     ############################ Extra Feature Layers Start ############################
+    # 3x3 convolutions of the extra layers are depthwise 3x3 + relu followed by pointwise 1x1 as in mobilenet ssd for less computation
     # conv8 block <=> conv6 block in paper caffe implementation
     conv8_1 = Conv2D(256, (1, 1), strides=(1, 1), padding="valid", activation="relu", kernel_initializer="glorot_normal", kernel_regularizer=l2(reg_factor), name="conv8_1")(conv7)
-    conv8_2 = Conv2D(512, (3, 3), strides=(2, 2), padding="same", activation="relu", kernel_initializer="glorot_normal", kernel_regularizer=l2(reg_factor), name="conv8_2")(conv8_1)
+    conv8_2_dw = DepthwiseConv2D((3, 3), strides=(2, 2), padding="same", activation="relu", depthwise_initializer="glorot_normal", depthwise_regularizer=l2(reg_factor), name="conv8_2_dw")(conv8_1)
+    conv8_2 = Conv2D(512, (1, 1), strides=(1, 1), padding="valid", activation="relu", kernel_initializer="glorot_normal", kernel_regularizer=l2(reg_factor), name="conv8_2")(conv8_2_dw)
     # conv9 block <=> conv7 block in paper caffe implementation
     conv9_1 = Conv2D(128, (1, 1), strides=(1, 1), padding="valid", activation="relu", kernel_initializer="glorot_normal", kernel_regularizer=l2(reg_factor), name="conv9_1")(conv8_2)
-    conv9_2 = Conv2D(256, (3, 3), strides=(2, 2), padding="same", activation="relu", kernel_initializer="glorot_normal", kernel_regularizer=l2(reg_factor), name="conv9_2")(conv9_1)
+    conv9_2_dw = DepthwiseConv2D((3, 3), strides=(2, 2), padding="same", activation="relu", depthwise_initializer="glorot_normal", depthwise_regularizer=l2(reg_factor), name="conv9_2_dw")(conv9_1)
+    conv9_2 = Conv2D(256, (1, 1), strides=(1, 1), padding="valid", activation="relu", kernel_initializer="glorot_normal", kernel_regularizer=l2(reg_factor), name="conv9_2")(conv9_2_dw)
     # conv10 block <=> conv8 block in paper caffe implementation
     conv10_1 = Conv2D(128, (1, 1), strides=(1, 1), padding="valid", activation="relu", kernel_initializer="glorot_normal", kernel_regularizer=l2(reg_factor), name="conv10_1")(conv9_2)
-    conv10_2 = Conv2D(256, (3, 3), strides=(1, 1), padding="valid", activation="relu", kernel_initializer="glorot_normal", kernel_regularizer=l2(reg_factor), name="conv10_2")(conv10_1)
+    conv10_2_dw = DepthwiseConv2D((3, 3), strides=(1, 1), padding="valid", activation="relu", depthwise_initializer="glorot_normal", depthwise_regularizer=l2(reg_factor), name="conv10_2_dw")(conv10_1)
+    conv10_2 = Conv2D(256, (1, 1), strides=(1, 1), padding="valid", activation="relu", kernel_initializer="glorot_normal", kernel_regularizer=l2(reg_factor), name="conv10_2")(conv10_2_dw)
     # conv11 block <=> conv9 block in paper caffe implementation
     conv11_1 = Conv2D(128, (1, 1), strides=(1, 1), padding="valid", activation="relu", kernel_initializer="glorot_normal", kernel_regularizer=l2(reg_factor), name="conv11_1")(conv10_2)
-    conv11_2 = Conv2D(256, (3, 3), strides=(1, 1), padding="valid", activation="relu", kernel_initializer="glorot_normal", kernel_regularizer=l2(reg_factor), name="conv11_2")(conv11_1)
+    conv11_2_dw = DepthwiseConv2D((3, 3), strides=(1, 1), padding="valid", activation="relu", depthwise_initializer="glorot_normal", depthwise_regularizer=l2(reg_factor), name="conv11_2_dw")(conv11_1)
+    conv11_2 = Conv2D(256, (1, 1), strides=(1, 1), padding="valid", activation="relu", kernel_initializer="glorot_normal", kernel_regularizer=l2(reg_factor), name="conv11_2")(conv11_2_dw)
     ############################ Extra Feature Layers End ############################
     # l2 normalization for each location in the feature map
-    conv4_3_norm = L2Normalization(scale_factor)(conv4_3)
+    # Sum of squares could overflow in float16, so this layer always computed in float32
+    conv4_3_norm = L2Normalization(scale_factor, dtype="float32", name="conv4_3_norm")(conv4_3)
     #
     pred_deltas, pred_labels = get_head_from_outputs(hyper_params, [conv4_3_norm, conv7, conv8_2, conv9_2, conv10_2, conv11_2])
     return Model(inputs=input, outputs=[pred_deltas, pred_labels])
 
+def load_backbone_weights(model):
+    """Loading imagenet pretrained vgg16 weights into the backbone layers.
+    fc6 and fc7 weights are subsampled into conv6 and conv7 as in the original caffe implementation.
+    https://gist.github.com/weiliu89/2ed6e13bfd5b57cf81d6
+    inputs:
+        model = tf.keras.model
+
+    """
+    vgg16 = VGG16(include_top=True, weights="imagenet")
+    for block, total_convs in enumerate([2, 2, 3, 3, 3], start=1):
+        for conv in range(1, total_convs + 1):
+            vgg16_layer = vgg16.get_layer("block{}_conv{}".format(block, conv))
+            model.get_layer("conv{}_{}".format(block, conv)).set_weights(vgg16_layer.get_weights())
+    # fc6 (7 x 7 x 512, 4096) => conv6 (3 x 3 x 512, 1024), every 3rd spatial position for the dilated kernel
+    fc6_kernel, fc6_bias = vgg16.get_layer("fc1").get_weights()
+    fc6_kernel = fc6_kernel.reshape((7, 7, 512, 4096))
+    model.get_layer("conv6").set_weights([fc6_kernel[::3, ::3, :, ::4], fc6_bias[::4]])
+    # fc7 (4096, 4096) => conv7 (1 x 1 x 1024, 1024)
+    fc7_kernel, fc7_bias = vgg16.get_layer("fc2").get_weights()
+    model.get_layer("conv7").set_weights([fc7_kernel[::4, ::4].reshape((1, 1, 1024, 1024)), fc7_bias[::4]])
+
 def init_model(model):
     """Initializing model with dummy data for load weights with optimizer state and also graph construction.
     inputs:
@@ -103,3 +151,23 @@ def init_model(model):
 
     """
     model(tf.random.uniform((1, 512, 512, 3)))
+
+def fuse_l2_normalization(model):
+    """Folding learned l2 normalization scale factors into the following head convolutions for inference.
+    Scale factors are per input channel, so conv(normalized * scale, W) == conv(normalized, W * scale).
+    After this operation the model should only be used for inference.
+    inputs:
+        model = tf.keras.model
+
+    outputs:
+        model = tf.keras.model with fused l2 normalization
+    """
+    l2_norm_layer = model.get_layer("conv4_3_norm")
+    scale = l2_norm_layer.scale.numpy().reshape((1, 1, -1, 1))
+    # conv4_3 is the first feature map for the heads
+    for layer_name in ["1_conv_label_output", "1_conv_boxes_output"]:
+        conv_layer = model.get_layer(layer_name)
+        kernel, bias = conv_layer.get_weights()
+        conv_layer.set_weights([kernel * scale, bias])
+    l2_norm_layer.fused = True
+    return model
@@ -5,6 +5,8 @@ from models.decoder import get_decoder_model
 args = io_utils.handle_args()
 if args.handle_gpu:
     io_utils.handle_gpu_compatibility()
+if args.mixed_precision:
+    io_utils.handle_mixed_precision()
 
 batch_size = 32
 evaluate = False
@@ -16,7 +18,7 @@ io_utils.is_valid_backbone(backbone)
 if backbone == "mobilenet_v2":
     from models.ssd_mobilenet_v2 import get_model, init_model
 else:
-    from models.ssd_vgg16 import get_model, init_model
+    from models.ssd_vgg16 import get_model, init_model, fuse_l2_normalization
 #
 hyper_params = train_utils.get_hyper_params(backbone)
 #
@@ -44,6 +46,8 @@ test_data = test_data.padded_batch(batch_size, padded_shapes=data_shapes, paddin
 ssd_model = get_model(hyper_params)
 ssd_model_path = io_utils.get_model_path(backbone)
 ssd_model.load_weights(ssd_model_path)
+if backbone == "vgg16":
+    ssd_model = fuse_l2_normalization(ssd_model)
 
 prior_boxes = bbox_utils.generate_prior_boxes(hyper_params["feature_map_shapes"], hyper_params["aspect_ratios"])
 ssd_decoder_model = get_decoder_model(ssd_model, prior_boxes, hyper_params)
@@ -1,5 +1,17 @@
 import tensorflow as tf
 
+def huber_loss_fn(actual, pred):
+    """Calculating elementwise smooth L1 / huber loss with delta 1.
+    inputs:
+        actual = (dynamic_dimension)
+        pred = (dynamic_dimension)
+
+    outputs:
+        huber_loss = (dynamic_dimension)
+    """
+    abs_diff = tf.abs(actual - pred)
+    return tf.where(tf.less(abs_diff, tf.constant(1.0)), 0.5 * tf.square(abs_diff), abs_diff - 0.5)
+
 class CustomLoss(object):
     def __init__(self, neg_pos_ratio, loc_loss_alpha):
         self.neg_pos_ratio = tf.constant(neg_pos_ratio, dtype=tf.float32)
@@ -15,12 +27,7 @@ class CustomLoss(object):
             loc_loss = localization / regression / bounding box loss value
         """
         # Localization / bbox / regression loss calculation for all bboxes
-        loc_loss_fn = tf.losses.Huber(reduction=tf.losses.Reduction.NONE)
-        loc_loss_for_all = loc_loss_fn(actual_deltas, pred_deltas)
-        # After tf 2.2.0 version, the huber calculates mean over the last axis
-        loc_loss_for_all = tf.cond(tf.greater(tf.rank(loc_loss_for_all), tf.constant(2)),
-                                   lambda: tf.reduce_sum(loc_loss_for_all, axis=-1),
-                                   lambda: loc_loss_for_all * tf.cast(tf.shape(pred_deltas)[-1], dtype=tf.float32))
+        loc_loss_for_all = tf.reduce_sum(huber_loss_fn(actual_deltas, pred_deltas), axis=-1)
         #
         pos_cond = tf.reduce_any(tf.not_equal(actual_deltas, tf.constant(0.0)), axis=2)
         pos_mask = tf.cast(pos_cond, dtype=tf.float32)
@@ -35,30 +42,39 @@ class CustomLoss(object):
     def conf_loss_fn(self, actual_labels, pred_labels):
         """Calculating SSD confidence loss value by performing hard negative mining as mentioned in the paper.
         inputs:
-            actual_labels = (batch_size, total_prior_boxes, total_labels)
+            actual_labels = (batch_size, total_prior_boxes)
+                0 for background and 1 to total label number for positive bboxes
             pred_labels = (batch_size, total_prior_boxes, total_labels)
+                raw logits
 
         outputs:
             conf_loss = confidence / class / label loss value
         """
-        # Confidence / Label loss calculation for all labels
-        conf_loss_fn = tf.losses.CategoricalCrossentropy(reduction=tf.losses.Reduction.NONE)
-        conf_loss_for_all = conf_loss_fn(actual_labels, pred_labels)
+        # Keras could pass the actual labels as float
+        actual_labels = tf.cast(actual_labels, tf.int32)
+        # Confidence / Label loss calculation for all labels, softmax fused into the cross entropy
+        conf_loss_for_all = tf.nn.sparse_softmax_cross_entropy_with_logits(labels=actual_labels, logits=pred_labels)
         #
-        pos_cond = tf.reduce_any(tf.not_equal(actual_labels[..., 1:], tf.constant(0.0)), axis=2)
+        pos_cond = tf.not_equal(actual_labels, tf.constant(0))
         pos_mask = tf.cast(pos_cond, dtype=tf.float32)
         total_pos_bboxes = tf.reduce_sum(pos_mask, axis=1)
         # Hard negative mining
         total_neg_bboxes = tf.cast(total_pos_bboxes * self.neg_pos_ratio, tf.int32)
         #
-        masked_loss = conf_loss_for_all * actual_labels[..., 0]
-        sorted_loss = tf.argsort(masked_loss, direction="DESCENDING")
-        sorted_loss = tf.argsort(sorted_loss)
-        neg_cond = tf.less(sorted_loss, tf.expand_dims(total_neg_bboxes, axis=1))
-        neg_mask = tf.cast(neg_cond, dtype=tf.float32)
-        #
-        final_mask = pos_mask + neg_mask
-        conf_loss = tf.reduce_sum(final_mask * conf_loss_for_all, axis=-1)
+        masked_loss = tf.where(pos_cond, tf.constant(0.0), conf_loss_for_all)
+        # Only the top max_neg_bboxes losses are needed for each row, no need to sort all prior boxes
+        batch_size, total_items = tf.shape(masked_loss)[0], tf.shape(masked_loss)[1]
+        max_neg_bboxes = tf.minimum(tf.reduce_max(total_neg_bboxes), total_items)
+        _, top_loss_indices = tf.math.top_k(masked_loss, k=max_neg_bboxes)
+        batch_indices = tf.broadcast_to(tf.range(batch_size)[:, tf.newaxis], tf.shape(top_loss_indices))
+        neg_bbox_indices = tf.stack([batch_indices, top_loss_indices], axis=-1)
+        # Exactly total_neg_bboxes negatives selected for each row, even if the losses are tied
+        selected_neg_cond = tf.less(tf.range(max_neg_bboxes), tf.expand_dims(total_neg_bboxes, axis=1))
+        neg_mask = tf.scatter_nd(neg_bbox_indices, tf.cast(selected_neg_cond, dtype=tf.float32), tf.shape(masked_loss))
+        neg_cond = tf.greater(neg_mask, tf.constant(0.0))
+        # Each selected prior box counted only once, even if it is both positive and picked as negative
+        final_cond = tf.logical_or(pos_cond, neg_cond)
+        conf_loss = tf.reduce_sum(tf.where(final_cond, conf_loss_for_all, tf.constant(0.0)), axis=-1)
         total_pos_bboxes = tf.where(tf.equal(total_pos_bboxes, tf.constant(0.0)), tf.constant(1.0), total_pos_bboxes)
         conf_loss = conf_loss / total_pos_bboxes
         #
@@ -8,6 +8,11 @@ from utils import bbox_utils, data_utils, io_utils, train_utils
 args = io_utils.handle_args()
 if args.handle_gpu:
     io_utils.handle_gpu_compatibility()
+if args.mixed_precision:
+    io_utils.handle_mixed_precision()
+# Keras already runs the train step (forward pass + losses + gradients) as a tf.function,
+# XLA auto clustering fuses the small elementwise / reduction ops of the losses into fewer kernels
+tf.config.optimizer.set_jit(True)
 
 batch_size = 32
 epochs = 150
@@ -19,7 +24,7 @@ io_utils.is_valid_backbone(backbone)
 if backbone == "mobilenet_v2":
     from models.ssd_mobilenet_v2 import get_model, init_model
 else:
-    from models.ssd_vgg16 import get_model, init_model
+    from models.ssd_vgg16 import get_model, init_model, load_backbone_weights
 #
 hyper_params = train_utils.get_hyper_params(backbone)
 #
@@ -39,8 +44,9 @@ labels = ["bg"] + labels
 hyper_params["total_labels"] = len(labels)
 img_size = hyper_params["img_size"]
 
-train_data = train_data.map(lambda x : data_utils.preprocessing(x, img_size, img_size, augmentation.apply))
-val_data = val_data.map(lambda x : data_utils.preprocessing(x, img_size, img_size))
+autotune = tf.data.experimental.AUTOTUNE
+train_data = train_data.map(lambda x : data_utils.preprocessing(x, img_size, img_size, augmentation.apply), num_parallel_calls=autotune)
+val_data = val_data.map(lambda x : data_utils.preprocessing(x, img_size, img_size), num_parallel_calls=autotune)
 
 data_shapes = data_utils.get_data_shapes()
 padding_values = data_utils.get_padding_values()
@@ -56,11 +62,13 @@ init_model(ssd_model)
 ssd_model_path = io_utils.get_model_path(backbone)
 if load_weights:
     ssd_model.load_weights(ssd_model_path)
+elif backbone == "vgg16":
+    load_backbone_weights(ssd_model)
 ssd_log_path = io_utils.get_log_path(backbone)
 # We calculate prior boxes for one time and use it for all operations because of the all images are the same sizes
 prior_boxes = bbox_utils.generate_prior_boxes(hyper_params["feature_map_shapes"], hyper_params["aspect_ratios"])
-ssd_train_feed = train_utils.generator(train_data, prior_boxes, hyper_params)
-ssd_val_feed = train_utils.generator(val_data, prior_boxes, hyper_params)
+ssd_train_feed = train_utils.get_data_feed(train_data, prior_boxes, hyper_params)
+ssd_val_feed = train_utils.get_data_feed(val_data, prior_boxes, hyper_params)
 
 checkpoint_callback = ModelCheckpoint(ssd_model_path, monitor="val_loss", save_best_only=True, save_weights_only=True)
 tensorboard_callback = TensorBoard(log_dir=ssd_log_path)
@@ -1,4 +1,5 @@
 import tensorflow as tf
+import numpy as np
 
 def non_max_suppression(pred_bboxes, pred_labels, **kwargs):
     """Applying non maximum suppression.
@@ -123,6 +124,27 @@ def get_scale_for_nth_feature_map(k, m=6, scale_min=0.2, scale_max=0.9):
     """
     return scale_min + ((scale_max - scale_min) / (m - 1)) * (k - 1)
 
+def get_height_width_pairs(aspect_ratios, feature_map_index, total_feature_map):
+    """Generating height and width pairs for different aspect ratios of given feature map.
+    inputs:
+        aspect_ratios = for all feature map shapes + 1 for ratio 1
+        feature_map_index = nth feature maps for scale calculation
+        total_feature_map = length of all using feature map for detections, 6 for ssd300
+
+    outputs:
+        height_width_pairs = (prior_box_count, [height, width])
+    """
+    current_scale = get_scale_for_nth_feature_map(feature_map_index, m=total_feature_map)
+    next_scale = get_scale_for_nth_feature_map(feature_map_index + 1, m=total_feature_map)
+    sqrt_aspect_ratios = np.sqrt(np.asarray(aspect_ratios, dtype=np.float32))
+    heights = current_scale / sqrt_aspect_ratios
+    widths = current_scale * sqrt_aspect_ratios
+    # 1 extra pair for ratio 1
+    extra_height_width = np.sqrt(current_scale * next_scale)
+    heights = np.append(heights, extra_height_width)
+    widths = np.append(widths, extra_height_width)
+    return np.stack([heights, widths], axis=-1).astype(np.float32)
+
 def generate_base_prior_boxes(aspect_ratios, feature_map_index, total_feature_map):
     """Generating top left prior boxes for given stride, height and width pairs of different aspect ratios.
     These prior boxes same with the anchors in Faster-RCNN.
@@ -134,17 +156,9 @@ def generate_base_prior_boxes(aspect_ratios, feature_map_index, total_feature_ma
     outputs:
         base_prior_boxes = (prior_box_count, [y1, x1, y2, x2])
     """
-    current_scale = get_scale_for_nth_feature_map(feature_map_index, m=total_feature_map)
-    next_scale = get_scale_for_nth_feature_map(feature_map_index + 1, m=total_feature_map)
-    base_prior_boxes = []
-    for aspect_ratio in aspect_ratios:
-        height = current_scale / tf.sqrt(aspect_ratio)
-        width = current_scale * tf.sqrt(aspect_ratio)
-        base_prior_boxes.append([-height/2, -width/2, height/2, width/2])
-    # 1 extra pair for ratio 1
-    height = width = tf.sqrt(current_scale * next_scale)
-    base_prior_boxes.append([-height/2, -width/2, height/2, width/2])
-    return tf.cast(base_prior_boxes, dtype=tf.float32)
+    half_height_width_pairs = get_height_width_pairs(aspect_ratios, feature_map_index, total_feature_map) / 2
+    # [-height/2, -width/2, height/2, width/2] for all pairs at once
+    return np.concatenate([-half_height_width_pairs, half_height_width_pairs], axis=-1)
 
 def generate_prior_boxes(feature_map_shapes, aspect_ratios):
     """Generating top left prior boxes for given stride, height and width pairs of different aspect ratios.
@@ -157,23 +171,18 @@ def generate_prior_boxes(feature_map_shapes, aspect_ratios):
         prior_boxes = (total_prior_boxes, [y1, x1, y2, x2])
             these values in normalized format between [0, 1]
     """
+    total_feature_map = len(feature_map_shapes)
     prior_boxes = []
     for i, feature_map_shape in enumerate(feature_map_shapes):
-        base_prior_boxes = generate_base_prior_boxes(aspect_ratios[i], i+1, len(feature_map_shapes))
-        #
-        stride = 1 / feature_map_shape
-        grid_coords = tf.cast(tf.range(0, feature_map_shape) / feature_map_shape + stride / 2, dtype=tf.float32)
-        grid_x, grid_y = tf.meshgrid(grid_coords, grid_coords)
-        flat_grid_x, flat_grid_y = tf.reshape(grid_x, (-1, )), tf.reshape(grid_y, (-1, ))
-        #
-        grid_map = tf.stack([flat_grid_y, flat_grid_x, flat_grid_y, flat_grid_x], -1)
-        #
-        prior_boxes_for_feature_map = tf.reshape(base_prior_boxes, (1, -1, 4)) + tf.reshape(grid_map, (-1, 1, 4))
-        prior_boxes_for_feature_map = tf.reshape(prior_boxes_for_feature_map, (-1, 4))
+        base_prior_boxes = generate_base_prior_boxes(aspect_ratios[i], i+1, total_feature_map)
+        # Center of each cell in the feature map, row major order
+        grid_y, grid_x = (np.mgrid[0:feature_map_shape, 0:feature_map_shape].astype(np.float32) + 0.5) / feature_map_shape
+        grid_map = np.stack([grid_y, grid_x, grid_y, grid_x], axis=-1).reshape(-1, 1, 4)
         #
-        prior_boxes.append(prior_boxes_for_feature_map)
-    prior_boxes = tf.concat(prior_boxes, axis=0)
-    return tf.clip_by_value(prior_boxes, 0, 1)
+        prior_boxes_for_feature_map = grid_map + base_prior_boxes.reshape(1, -1, 4)
+        prior_boxes.append(prior_boxes_for_feature_map.reshape(-1, 4))
+    prior_boxes = np.concatenate(prior_boxes, axis=0)
+    return np.clip(prior_boxes, 0, 1, out=prior_boxes)
 
 def renormalize_bboxes_with_min_max(bboxes, min_max):
     """Renormalizing given bounding boxes to the new boundaries.
@@ -44,6 +44,17 @@ def get_dataset(name, split, data_dir="~/tensorflow_datasets"):
     dataset, info = tfds.load(name, split=split, data_dir=data_dir, with_info=True)
     return dataset, info
 
+def get_dataset_info(name, data_dir="~/tensorflow_datasets"):
+    """Get tensorflow dataset info without downloading or preparing the dataset.
+    inputs:
+        name = name of the dataset, voc/2007, voc/2012, etc.
+        data_dir = read/write path for tensorflow datasets
+
+    outputs:
+        info = tensorflow dataset info
+    """
+    return tfds.builder(name, data_dir=data_dir).info
+
 def get_total_item_size(info, split):
     """Get total item size for given split.
     inputs:
@@ -28,6 +28,20 @@ def get_model_path(model_type):
     model_path = os.path.join(main_path, "ssd_{}_model_weights.h5".format(model_type))
     return model_path
 
+def get_export_path(model_type):
+    """Generating export path from model_type value for saved model.
+    inputs:
+        model_type = "vgg16", "mobilenet_v2"
+
+    outputs:
+        export_path = os export path, for example: "exported/ssd_vgg16"
+    """
+    main_path = "exported"
+    if not os.path.exists(main_path):
+        os.makedirs(main_path)
+    export_path = os.path.join(main_path, "ssd_{}".format(model_type))
+    return export_path
+
 def handle_args():
     """Handling of command line arguments using argparse library.
 
@@ -36,6 +50,7 @@ def handle_args():
     """
     parser = argparse.ArgumentParser(description="SSD: Single Shot MultiBox Detector Implementation")
     parser.add_argument("-handle-gpu", action="store_true", help="Tensorflow 2 GPU compatibility flag")
+    parser.add_argument("-mixed-precision", action="store_true", help="Mixed float16 precision flag for tensor core GPUs")
     parser.add_argument("--backbone", required=False,
                         default="mobilenet_v2",
                         metavar="['mobilenet_v2', 'vgg16']",
@@ -59,3 +74,12 @@ def handle_gpu_compatibility():
             tf.config.experimental.set_memory_growth(gpu, True)
     except Exception as e:
         print(e)
+
+def handle_mixed_precision():
+    """Enabling mixed float16 policy for tensor core GPUs.
+    Layers compute in float16 while variables kept in float32,
+    loss scaling is applied by keras when the model compiled under this policy.
+    It requires tensorflow 2.1 or later.
+    """
+    policy = tf.keras.mixed_precision.experimental.Policy("mixed_float16")
+    tf.keras.mixed_precision.experimental.set_policy(policy)
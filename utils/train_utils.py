@@ -70,8 +70,9 @@ def get_step_size(total_items, batch_size):
     """
     return math.ceil(total_items / batch_size)
 
-def generator(dataset, prior_boxes, hyper_params):
-    """Tensorflow data generator for fit method, yielding inputs and outputs.
+def get_data_feed(dataset, prior_boxes, hyper_params):
+    """Generating tensorflow dataset feed for fit method with inputs and actual outputs.
+    Actual outputs calculated in parallel by tf.data and batches prefetched while training.
     inputs:
         dataset = tf.data.Dataset, PaddedBatchDataset
         prior_boxes = (total_prior_boxes, [y1, x1, y2, x2])
@@ -79,13 +80,14 @@ def generator(dataset, prior_boxes, hyper_params):
         hyper_params = dictionary
 
     outputs:
-        yield inputs, outputs
+        data_feed = tf.data.Dataset, infinitely yielding inputs, outputs
     """
-    while True:
-        for image_data in dataset:
-            img, gt_boxes, gt_labels = image_data
-            actual_deltas, actual_labels = calculate_actual_outputs(prior_boxes, gt_boxes, gt_labels, hyper_params)
-            yield img, (actual_deltas, actual_labels)
+    # Prior boxes are converted to a tensor only once and captured as a constant by the map function
+    prior_boxes = tf.constant(prior_boxes, dtype=tf.float32)
+    autotune = tf.data.experimental.AUTOTUNE
+    data_feed = dataset.map(lambda img, gt_boxes, gt_labels: (img, calculate_actual_outputs(prior_boxes, gt_boxes, gt_labels, hyper_params)),
+                            num_parallel_calls=autotune)
+    return data_feed.repeat().prefetch(autotune)
 
 def calculate_actual_outputs(prior_boxes, gt_boxes, gt_labels, hyper_params):
     """Calculate ssd actual output values.
@@ -100,10 +102,10 @@ def calculate_actual_outputs(prior_boxes, gt_boxes, gt_labels, hyper_params):
 
     outputs:
         bbox_deltas = (batch_size, total_bboxes, [delta_y, delta_x, delta_h, delta_w])
-        bbox_labels = (batch_size, total_bboxes, [0,0,...,0])
+        bbox_labels = (batch_size, total_bboxes)
+            0 for background and 1 to total label number for positive bboxes
     """
     batch_size = tf.shape(gt_boxes)[0]
-    total_labels = hyper_params["total_labels"]
     iou_threshold = hyper_params["iou_threshold"]
     variances = hyper_params["variances"]
     total_prior_boxes = prior_boxes.shape[0]
@@ -117,11 +119,11 @@ def calculate_actual_outputs(prior_boxes, gt_boxes, gt_labels, hyper_params):
     pos_cond = tf.greater(merged_iou_map, iou_threshold)
     #
     gt_boxes_map = tf.gather(gt_boxes, max_indices_each_gt_box, batch_dims=1)
-    expanded_gt_boxes = tf.where(tf.expand_dims(pos_cond, -1), gt_boxes_map, tf.zeros_like(gt_boxes_map))
+    # Background boxes selected with broadcasted scalar zeros instead of materialized zero tensors
+    expanded_gt_boxes = tf.where(tf.expand_dims(pos_cond, -1), gt_boxes_map, tf.constant(0.0))
     bbox_deltas = bbox_utils.get_deltas_from_bboxes(prior_boxes, expanded_gt_boxes) / variances
     #
     gt_labels_map = tf.gather(gt_labels, max_indices_each_gt_box, batch_dims=1)
-    expanded_gt_labels = tf.where(pos_cond, gt_labels_map, tf.zeros_like(gt_labels_map))
-    bbox_labels = tf.one_hot(expanded_gt_labels, total_labels)
+    bbox_labels = tf.where(pos_cond, gt_labels_map, tf.constant(0))
     #
     return bbox_deltas, bbox_labels